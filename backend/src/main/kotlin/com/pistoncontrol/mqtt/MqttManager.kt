@@ -144,16 +144,17 @@ class MqttManager(
         val deviceId = topicParts[1]
         
         // Step 2: Detect message format (binary vs JSON)
-        val deviceMessage = if (isBinaryMessage(data, topic)) {
+        // A binary batch frame expands to several messages
+        val deviceMessages = if (isBinaryMessage(data, topic)) {
             parseBinaryMessage(deviceId, topic, data)
         } else {
-            parseJsonMessage(deviceId, topic, data)
+            listOfNotNull(parseJsonMessage(deviceId, topic, data))
         }
         
         // Step 3: Broadcast to WebSocket clients
-        if (deviceMessage != null) {
+        if (deviceMessages.isNotEmpty()) {
             GlobalScope.launch {
-                _messageFlow.emit(deviceMessage)
+                deviceMessages.forEach { _messageFlow.emit(it) }
             }
         }
     }
@@ -162,7 +163,8 @@ class MqttManager(
      * Detect if message is binary or JSON
      * 
      * Binary messages have these characteristics:
-     * 1. First byte is a valid message type (0x01-0x04)
+     * 1. First byte is a valid message type (0x01-0x04, or 0x10 for a batch),
+     *    optionally with the protocol V2 bit (0x80) set
      * 2. Minimum size is 19 bytes
      * 3. Topic ends with "/binary"
      * 4. NOT starting with '{' or '[' (JSON markers)
@@ -174,8 +176,8 @@ class MqttManager(
         if (topic.endsWith("/binary")) return true
         
         // Check message characteristics
-        val firstByte = data[0]
-        val isValidMessageType = firstByte in 0x01..0x04
+        val firstByte = (data[0].toInt() and BinaryProtocolParser.MESSAGE_TYPE_MASK).toByte()
+        val isValidMessageType = firstByte in 0x01..0x04 || firstByte == BinaryProtocolParser.MSG_BATCH
         val hasMinimumSize = data.size >= BinaryProtocolParser.MIN_MESSAGE_SIZE
         val notJsonStart = data[0] != '{'.code.toByte() && data[0] != '['.code.toByte()
         
@@ -184,13 +186,29 @@ class MqttManager(
     
     /**
      * Parse binary message using BinaryProtocolParser
+     * 
+     * Returns one message per entry for batch frames, otherwise at most one
      */
-    private fun parseBinaryMessage(deviceId: String, topic: String, data: ByteArray): DeviceMessage? {
+    private fun parseBinaryMessage(deviceId: String, topic: String, data: ByteArray): List<DeviceMessage> {
         logger.debug { "Parsing binary message from $deviceId (${data.size} bytes)" }
         
-        val parsed = parser.parse(data) ?: return null
+        val parsed = parser.parse(data) ?: return emptyList()
         
-        // Convert parsed message to our internal format
+        return if (parsed is BinaryProtocolParser.ParsedMessage.Batch) {
+            parsed.messages.map { toDeviceMessage(deviceId, topic, it) }
+        } else {
+            listOf(toDeviceMessage(deviceId, topic, parsed))
+        }
+    }
+    
+    /**
+     * Convert a parsed binary message to our internal format
+     */
+    private fun toDeviceMessage(
+        deviceId: String,
+        topic: String,
+        parsed: BinaryProtocolParser.ParsedMessage
+    ): DeviceMessage {
         return when (parsed) {
             is BinaryProtocolParser.ParsedMessage.PistonStateChange -> {
                 DeviceMessage(
@@ -242,6 +260,16 @@ class MqttManager(
                     )
                 )
             }
+            
+            is BinaryProtocolParser.ParsedMessage.Batch -> {
+                // Batches are flattened by parseBinaryMessage and never nest
+                DeviceMessage(
+                    deviceId = deviceId,
+                    topic = topic,
+                    messageType = MessageType.UNKNOWN,
+                    payload = MessagePayload.Raw(rawData = "batch(${parsed.messages.size})")
+                )
+            }
         }
     }
     
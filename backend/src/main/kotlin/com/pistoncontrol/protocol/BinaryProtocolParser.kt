@@ -3,6 +3,7 @@ package com.pistoncontrol.protocol
 import java.nio.ByteBuffer
 import java.nio.ByteOrder
 import java.util.UUID
+import java.util.zip.CRC32
 import mu.KotlinLogging
 
 private val logger = KotlinLogging.logger {}
@@ -18,12 +19,19 @@ private val logger = KotlinLogging.logger {}
  * - Device ID (16 bytes): UUID of the device
  * - Payload (variable): Message-specific data
  * - Checksum (2 bytes): CRC16 for data integrity
+ *   (4 bytes CRC-32 when the V2 bit, 0x80, is set in the header)
  * 
  * Message Types:
  * 0x01 = Piston State Change
  * 0x02 = Status Update
  * 0x03 = Telemetry Data
  * 0x04 = Error Report
+ * 0x10 = Batch (several of the above in one frame, single checksum)
+ * 
+ * Protocol V2 sets the top bit of the header (e.g. 0x81 = V2 piston state)
+ * and replaces the trailing CRC16 with a CRC-32 (zlib/IEEE polynomial),
+ * which the JVM computes with hardware carry-less multiply. V1 frames are
+ * still accepted unchanged.
  */
 class BinaryProtocolParser {
     
@@ -33,12 +41,23 @@ class BinaryProtocolParser {
         const val MSG_STATUS_UPDATE: Byte = 0x02
         const val MSG_TELEMETRY: Byte = 0x03
         const val MSG_ERROR: Byte = 0x04
+        const val MSG_BATCH: Byte = 0x10
         
         // Protocol constants
         const val HEADER_SIZE = 1
         const val DEVICE_ID_SIZE = 16
         const val CHECKSUM_SIZE = 2
         const val MIN_MESSAGE_SIZE = HEADER_SIZE + DEVICE_ID_SIZE + CHECKSUM_SIZE
+        
+        // Protocol V2: header bit 0x80 selects a 4-byte CRC-32 checksum.
+        // This is the IEEE/zlib CRC-32 (java.util.zip.CRC32), not CRC32C: the
+        // Python side computes the same value with zlib.crc32, so neither end
+        // needs an extra dependency. Keep in sync with PROTOCOL_V2_FLAG there.
+        const val VERSION_V2_FLAG = 0x80
+        const val MESSAGE_TYPE_MASK = 0x7F
+        const val CHECKSUM_SIZE_V2 = 4
+        const val MIN_MESSAGE_SIZE_V2 = HEADER_SIZE + DEVICE_ID_SIZE + CHECKSUM_SIZE_V2
+        const val BATCH_ITEM_HEADER_SIZE = 3 // type (1 byte) + length (2 bytes)
     }
     
     /**
@@ -86,6 +105,14 @@ class BinaryProtocolParser {
             val errorCode: Int,
             val errorMessage: String
         ) : ParsedMessage()
+        
+        /**
+         * Several messages from one device sent in a single frame
+         */
+        data class Batch(
+            override val deviceId: UUID,
+            val messages: List<ParsedMessage>
+        ) : ParsedMessage()
     }
     
     /**
@@ -112,8 +139,15 @@ class BinaryProtocolParser {
             // LITTLE_ENDIAN matches most embedded systems (ARM, ESP32)
             val buffer = ByteBuffer.wrap(data).order(ByteOrder.LITTLE_ENDIAN)
             
-            // Step 3: Read header (message type)
-            val messageType = buffer.get()
+            // Step 3: Read header (message type + protocol version bit)
+            val header = buffer.get().toInt()
+            val isV2 = (header and VERSION_V2_FLAG) != 0
+            val messageType = (header and MESSAGE_TYPE_MASK).toByte()
+            val checksumSize = if (isV2) CHECKSUM_SIZE_V2 else CHECKSUM_SIZE
+            if (isV2 && data.size < MIN_MESSAGE_SIZE_V2) {
+                logger.warn { "V2 message too short: ${data.size} bytes (minimum: $MIN_MESSAGE_SIZE_V2)" }
+                return null
+            }
             
             // Step 4: Read device ID (16 bytes = 128-bit UUID)
             val deviceIdBytes = ByteArray(DEVICE_ID_SIZE)
@@ -121,13 +155,20 @@ class BinaryProtocolParser {
             val deviceId = bytesToUUID(deviceIdBytes)
             
             // Step 5: Extract payload (everything except header, device ID, and checksum)
-            val payloadSize = data.size - MIN_MESSAGE_SIZE
+            val payloadSize = data.size - HEADER_SIZE - DEVICE_ID_SIZE - checksumSize
             val payload = ByteArray(payloadSize)
             buffer.get(payload)
             
             // Step 6: Verify checksum for data integrity
-            val receivedChecksum = buffer.short.toInt() and 0xFFFF
-            val calculatedChecksum = calculateChecksum(data, data.size - CHECKSUM_SIZE)
+            val receivedChecksum: Long
+            val calculatedChecksum: Long
+            if (isV2) {
+                receivedChecksum = buffer.int.toLong() and 0xFFFFFFFFL
+                calculatedChecksum = calculateChecksumV2(data, data.size - CHECKSUM_SIZE_V2)
+            } else {
+                receivedChecksum = (buffer.short.toInt() and 0xFFFF).toLong()
+                calculatedChecksum = calculateChecksum(data, data.size - CHECKSUM_SIZE).toLong()
+            }
             
             if (receivedChecksum != calculatedChecksum) {
                 logger.error { 
@@ -142,6 +183,7 @@ class BinaryProtocolParser {
                 MSG_STATUS_UPDATE -> parseStatusUpdate(deviceId, payload)
                 MSG_TELEMETRY -> parseTelemetry(deviceId, payload)
                 MSG_ERROR -> parseError(deviceId, payload)
+                MSG_BATCH -> parseBatch(deviceId, payload)
                 else -> {
                     logger.warn { "Unknown message type: 0x${messageType.toString(16)}" }
                     null
@@ -277,6 +319,56 @@ class BinaryProtocolParser {
         )
     }
     
+    /**
+     * Parse batch message
+     * 
+     * Payload format:
+     * - Byte 0: Number of items
+     * - Per item: type (1 byte), payload length (2 bytes), payload
+     * 
+     * Items use the same payload layouts as the standalone message types.
+     * The whole frame is covered by the single checksum already verified.
+     */
+    private fun parseBatch(deviceId: UUID, payload: ByteArray): ParsedMessage.Batch? {
+        if (payload.isEmpty()) {
+            logger.warn { "Empty batch payload" }
+            return null
+        }
+        
+        val buffer = ByteBuffer.wrap(payload).order(ByteOrder.LITTLE_ENDIAN)
+        val count = buffer.get().toInt() and 0xFF
+        val messages = ArrayList<ParsedMessage>(count)
+        
+        repeat(count) {
+            if (buffer.remaining() < BATCH_ITEM_HEADER_SIZE) {
+                logger.warn { "Truncated batch: expected $count items, got ${messages.size}" }
+                return null
+            }
+            val itemType = buffer.get()
+            val itemSize = buffer.short.toInt() and 0xFFFF
+            if (buffer.remaining() < itemSize) {
+                logger.warn { "Truncated batch item: need $itemSize bytes, have ${buffer.remaining()}" }
+                return null
+            }
+            val itemPayload = ByteArray(itemSize)
+            buffer.get(itemPayload)
+            
+            val item = when (itemType) {
+                MSG_PISTON_STATE -> parsePistonState(deviceId, itemPayload)
+                MSG_STATUS_UPDATE -> parseStatusUpdate(deviceId, itemPayload)
+                MSG_TELEMETRY -> parseTelemetry(deviceId, itemPayload)
+                MSG_ERROR -> parseError(deviceId, itemPayload)
+                else -> {
+                    logger.warn { "Unknown batch item type: 0x${itemType.toString(16)}" }
+                    null
+                }
+            }
+            item?.let { messages.add(it) }
+        }
+        
+        return ParsedMessage.Batch(deviceId = deviceId, messages = messages)
+    }
+    
     /**
      * Convert 16 bytes to UUID
      * UUID is stored as two longs (most significant bits, least significant bits)
@@ -315,6 +407,18 @@ class BinaryProtocolParser {
         return crc and 0xFFFF
     }
     
+    /**
+     * Calculate the CRC-32 checksum used by protocol V2 frames
+     * 
+     * java.util.zip.CRC32 is a HotSpot intrinsic (PCLMULQDQ on x86, PMULL on
+     * ARMv8), so this runs at memory speed instead of bit by bit.
+     */
+    private fun calculateChecksumV2(data: ByteArray, length: Int): Long {
+        val crc = CRC32()
+        crc.update(data, 0, length)
+        return crc.value
+    }
+    
     /**
      * Create binary command to send to device
      * This is the reverse operation - encoding commands to binary
@@ -13,79 +13,280 @@ import paho.mqtt.client as mqtt
 import struct
 import time
 import uuid
+import zlib
 import random
+import threading
 from typing import Optional
 
-class BinaryProtocolClient:
+import binary_protocol as protocol
+
+
+class MqttTransport:
     """
-    Client that communicates using the binary protocol
+    One MQTT connection that any number of device clients can publish through
     
-    Protocol Structure:
-    [Header: 1 byte] [Device ID: 16 bytes] [Payload: variable] [Checksum: 2 bytes]
+    Simulating many devices from one process would otherwise open a socket and
+    a network thread per device. Inbound commands arrive on a single
+    subscription and are routed to the registered client by the device ID in
+    the frame header.
     """
     
-    # Message type constants (must match backend)
-    MSG_PISTON_STATE = 0x01
-    MSG_STATUS_UPDATE = 0x02
-    MSG_TELEMETRY = 0x03
-    MSG_ERROR = 0x04
+    # Wildcard subscription covering the command topic of every device
+    COMMAND_TOPIC = "devices/+/commands/binary"
     
-    def __init__(self, device_id: str, broker: str = "localhost", port: int = 1883):
+    # paho queues QoS 1 publishes beyond 20 unacknowledged ones; a connection
+    # shared by many devices needs a wider window to keep bursts on the wire
+    MAX_INFLIGHT = 100
+    
+    def __init__(self, broker: str = "localhost", port: int = 1883, client_id: str = "",
+                 command_topic: str = COMMAND_TOPIC, verbose: bool = False,
+                 max_inflight: int = MAX_INFLIGHT):
         """
-        Initialize binary protocol client
+        Initialize shared MQTT transport
         
         Args:
-            device_id: UUID string of this device
             broker: MQTT broker address
             port: MQTT broker port
+            client_id: MQTT client ID (empty lets the broker assign one)
+            command_topic: Topic (or filter) subscribed to on connect
+            verbose: Print connection events
+            max_inflight: QoS 1 messages allowed in flight before paho queues
         """
-        self.device_id = uuid.UUID(device_id)
         self.broker = broker
         self.port = port
+        self._command_topic = command_topic
+        self._verbose = verbose
+        
+        # Registered device clients, keyed by their 16 raw UUID bytes
+        self._devices = {}
+        
+        # Set from _on_connect once the broker has answered
+        self._connected = threading.Event()
+        self._connect_rc = None
         
         # Initialize MQTT client (paho-mqtt v2.0+ syntax)
         self.client = mqtt.Client(
-            mqtt.CallbackAPIVersion.VERSION1, 
-            str(self.device_id)
+            mqtt.CallbackAPIVersion.VERSION2, 
+            client_id
         )
         self.client.on_connect = self._on_connect
         self.client.on_message = self._on_message
-        
-        print(f"🔧 Binary Protocol Client initialized")
-        print(f"   Device ID: {self.device_id}")
-        print(f"   Broker: {broker}:{port}")
+        self.client.on_socket_open = protocol.set_tcp_nodelay
+        self.client.max_inflight_messages_set(max_inflight)
     
-    def _on_connect(self, client, userdata, flags, rc):
+    def register(self, device: "BinaryProtocolClient"):
+        """Route commands addressed to this device to its client"""
+        self._devices[device._uuid_bytes] = device
+    
+    def unregister(self, device: "BinaryProtocolClient"):
+        """Stop routing commands to this device"""
+        self._devices.pop(device._uuid_bytes, None)
+    
+    def publish(self, topic: str, payload, qos: int = 0):
+        """Publish a payload on the shared connection"""
+        return self.client.publish(topic, payload, qos=qos)
+    
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
         """Called when connected to MQTT broker"""
-        print(f"✅ Connected to broker (rc={rc})")
+        if self._verbose:
+            print(f"✅ Connected to broker (rc={reason_code})")
         
         # Subscribe to binary commands
-        topic = f"devices/{self.device_id}/commands/binary"
-        client.subscribe(topic)
-        print(f"📡 Subscribed to: {topic}")
+        client.subscribe(self._command_topic)
+        if self._verbose:
+            print(f"📡 Subscribed to: {self._command_topic}")
+        
+        # Wake up connect(), which waits for the broker's CONNACK
+        self._connect_rc = reason_code
+        self._connected.set()
     
     def _on_message(self, client, userdata, msg):
-        """Called when receiving a command from backend"""
-        print(f"\n📥 Received binary command ({len(msg.payload)} bytes)")
+        """Hand an inbound command to the device named in its header"""
+        device = self._devices.get(bytes(msg.payload[1:protocol.HEADER_SIZE]))
+        if device is not None:
+            device.handle_message(msg.payload)
+    
+    @property
+    def is_connected(self) -> bool:
+        return self._connected.is_set() and self._connect_rc == 0
+    
+    def connect(self, timeout: float = 5.0):
+        """Connect to MQTT broker and wait until the broker has answered"""
+        if self.is_connected:
+            return
+        
+        self._connected.clear()
+        self.client.connect(self.broker, self.port, 60)
+        self.client.loop_start()
+        
+        # On failure, also close the socket connect() opened, so a retry
+        # starts from a clean client
+        if not self._connected.wait(timeout):
+            self.client.loop_stop()
+            self.client.disconnect()
+            raise TimeoutError(f"No answer from MQTT broker {self.broker}:{self.port} after {timeout}s")
+        if self._connect_rc != 0:
+            self.client.loop_stop()
+            self.client.disconnect()
+            raise ConnectionError(f"MQTT broker refused connection (rc={self._connect_rc})")
+    
+    def disconnect(self):
+        """Disconnect from MQTT broker"""
+        self.client.loop_stop()
+        self.client.disconnect()
+        self._connected.clear()
+
+
+class BinaryProtocolClient:
+    """
+    Client that communicates using the binary protocol
+    
+    Protocol Structure:
+    [Header: 1 byte] [Device ID: 16 bytes] [Payload: variable] [Checksum: 2 bytes]
+    
+    Protocol V2 sets the top header bit (PROTOCOL_V2_FLAG) and uses a 4-byte
+    CRC-32 (zlib polynomial) instead of the CRC16. Both ends compute it in
+    native code: zlib here, the java.util.zip.CRC32 intrinsic in the backend.
+    """
+    
+    # Message type constants (must match backend)
+    MSG_PISTON_STATE = protocol.MSG_PISTON_STATE
+    MSG_STATUS_UPDATE = protocol.MSG_STATUS_UPDATE
+    MSG_TELEMETRY = protocol.MSG_TELEMETRY
+    MSG_ERROR = protocol.MSG_ERROR
+    MSG_BATCH = protocol.MSG_BATCH
+    
+    # Header bit selecting protocol V2 (CRC-32 checksum)
+    PROTOCOL_V2_FLAG = protocol.PROTOCOL_V2_FLAG
+    _MSG_TYPE_MASK = protocol.MSG_TYPE_MASK
+    
+    # Header (1 byte) + device ID (16 bytes) precede every payload
+    _PAYLOAD_OFFSET = protocol.HEADER_SIZE
+    
+    # Precompiled layouts (avoids re-parsing format strings per message);
+    # payload and checksum layouts are shared with the monitor
+    _HEADER_FMT = struct.Struct('B')
+    _PISTON_FMT = protocol.PISTON_FMT
+    _STATUS_FMT = protocol.STATUS_FMT
+    _TELEM_FMT = protocol.TELEMETRY_FMT
+    _ERR_FMT = protocol.ERROR_FMT
+    _CRC_FMT = protocol.CRC16_FMT
+    _CRC32_FMT = protocol.CRC32_FMT
+    _BATCH_COUNT_FMT = protocol.BATCH_COUNT_FMT
+    _BATCH_ITEM_FMT = protocol.BATCH_ITEM_FMT
+    _PARSE_PISTON = struct.Struct('<BB')
+    
+    def __init__(self, device_id: str, broker: str = "localhost", port: int = 1883,
+                 verbose: bool = False, protocol_version: int = 1,
+                 transport: Optional[MqttTransport] = None):
+        """
+        Initialize binary protocol client
+        
+        Args:
+            device_id: UUID string of this device
+            broker: MQTT broker address
+            port: MQTT broker port
+            verbose: Print every sent/received message. Off by default so
+                     high-rate publishing doesn't pay for formatting and stdout I/O.
+            protocol_version: 1 for CRC16 frames, 2 for CRC-32 frames
+            transport: Shared MqttTransport to publish through. When omitted the
+                       client opens its own connection to broker:port.
+        """
+        if protocol_version not in (1, 2):
+            raise ValueError(f"Unsupported protocol version: {protocol_version}")
+        
+        # Parse the UUID once; internals only use the raw bytes and string.
+        # device_id stays available for callers of the public API.
+        u = uuid.UUID(device_id)
+        self.device_id = u
+        self._uuid_bytes: bytes = u.bytes
+        self._uuid_str: str = str(u)
+        self.broker = broker
+        self.port = port
+        self._verbose = verbose
+        
+        # Checksum used for outbound frames
+        if protocol_version == 2:
+            version_flag = self.PROTOCOL_V2_FLAG
+            self._checksum_fmt = self._CRC32_FMT
+            self._checksum = self._calculate_crc32
+            checksum_code = 'I'
+        else:
+            version_flag = 0
+            self._checksum_fmt = self._CRC_FMT
+            self._checksum = self._calculate_crc16
+            checksum_code = 'H'
+        
+        # Whole-frame layouts (header + UUID, payload, checksum placeholder) for
+        # the fixed-size messages, so each one is packed with a single pack_into
+        self._piston_frame = struct.Struct('<17sBBQ' + checksum_code)
+        self._status_frame = struct.Struct('<17sBBB' + checksum_code)
+        self._telem_frame = struct.Struct('<17sBfQ' + checksum_code)
+        
+        # The device ID never changes, so the header + UUID prefix of every
+        # message type and the MQTT topics are built once here
+        self._msg_prefix = {
+            mt: self._HEADER_FMT.pack(mt | version_flag) + self._uuid_bytes
+            for mt in (self.MSG_PISTON_STATE, self.MSG_STATUS_UPDATE,
+                       self.MSG_TELEMETRY, self.MSG_ERROR, self.MSG_BATCH)
+        }
+        # Checksum state after each prefix, keyed by header byte, so sealing a
+        # message only runs the checksum over its payload
+        self._prefix_checksum = {
+            prefix[0]: self._checksum(prefix) for prefix in self._msg_prefix.values()
+        }
+        self._binary_topic = f"devices/{self._uuid_str}/binary"
+        self._command_topic = f"devices/{self._uuid_str}/commands/binary"
+        
+        # Status and telemetry are periodic and tolerate loss, so they skip the
+        # PUBACK round trip by default. Piston state and errors stay on QoS 1.
+        self._default_telemetry_qos = 0
+        
+        # Without a shared transport, open a private connection that only
+        # subscribes to this device's command topic
+        self._owns_transport = transport is None
+        if transport is None:
+            transport = MqttTransport(broker, port, client_id=self._uuid_str,
+                                      command_topic=self._command_topic, verbose=verbose)
+        else:
+            self.broker = transport.broker
+            self.port = transport.port
+        self._transport = transport
+        transport.register(self)
+        
+        print(f"🔧 Binary Protocol Client initialized")
+        print(f"   Device ID: {self._uuid_str}")
+        print(f"   Broker: {self.broker}:{self.port}")
+    
+    @property
+    def client(self) -> mqtt.Client:
+        """Underlying paho client (shared when a transport was passed in)"""
+        return self._transport.client
+    
+    def handle_message(self, payload: bytes):
+        """Handle a binary command from the backend addressed to this device"""
+        if self._verbose:
+            print(f"\n📥 Received binary command ({len(payload)} bytes)")
         
         try:
             # Parse the binary command
-            command = self._parse_command(msg.payload)
-            print(f"   Command: {command}")
+            command = self._parse_command(payload)
+            if self._verbose:
+                print(f"   Command: {command}")
         except Exception as e:
             print(f"   ❌ Error parsing command: {e}")
     
-    def connect(self):
-        """Connect to MQTT broker"""
+    def connect(self, timeout: float = 5.0):
+        """Connect to MQTT broker and wait until the broker has answered"""
         print(f"\n🔌 Connecting to {self.broker}:{self.port}...")
-        self.client.connect(self.broker, self.port, 60)
-        self.client.loop_start()
-        time.sleep(1)  # Give it time to connect
+        self._transport.connect(timeout)
     
     def disconnect(self):
-        """Disconnect from MQTT broker"""
-        self.client.loop_stop()
-        self.client.disconnect()
+        """Disconnect from MQTT broker (a shared transport stays connected)"""
+        if self._owns_transport:
+            self._transport.disconnect()
+        else:
+            self._transport.unregister(self)
     
     def send_piston_state(self, piston_number: int, is_active: bool):
         """
@@ -94,76 +295,87 @@ class BinaryProtocolClient:
         Binary Format:
         [0x01] [UUID: 16 bytes] [piston: 1 byte] [state: 1 byte] [timestamp: 8 bytes] [CRC: 2 bytes]
         """
-        print(f"\n📤 Sending piston {piston_number} state: {'ACTIVE' if is_active else 'INACTIVE'}")
+        if self._verbose:
+            print(f"\n📤 Sending piston {piston_number} state: {'ACTIVE' if is_active else 'INACTIVE'}")
         
         # ✅ FIX: Use milliseconds (not seconds)
-        timestamp = int(time.time() * 1000)
-        
-        # Pack payload: piston_number (byte), state (byte), timestamp (long)
-        payload = struct.pack('<BBQ', piston_number, 1 if is_active else 0, timestamp)
+        timestamp = time.time_ns() // 1_000_000
         
-        message = self._create_message(self.MSG_PISTON_STATE, payload)
+        # Pack the whole frame: prefix, piston_number (byte), state (byte), timestamp (long)
+        frame = self._piston_frame
+        message = bytearray(frame.size)
+        frame.pack_into(message, 0, self._msg_prefix[self.MSG_PISTON_STATE],
+                        piston_number, 1 if is_active else 0, timestamp, 0)
+        self._seal_message(message)
         
-        topic = f"devices/{self.device_id}/binary"
-        self.client.publish(topic, message, qos=1)
+        self._transport.publish(self._binary_topic, message, qos=1)
         
-        print(f"   ✓ Sent {len(message)} bytes (timestamp: {timestamp})")
+        if self._verbose:
+            print(f"   ✓ Sent {len(message)} bytes (timestamp: {timestamp})")
     
-    def send_status(self, status: str = "online", battery_level: int = None, signal_strength: int = None):
+    def send_status(self, status: str = "online", battery_level: int = None, signal_strength: int = None,
+                    qos: Optional[int] = None):
         """
         Send device status update
         
+        qos defaults to the client's telemetry QoS (0)
+        
         Binary Format:
         [0x02] [UUID: 16 bytes] [status: 1 byte] [battery: 1 byte] [signal: 1 byte] [CRC: 2 bytes]
         """
-        print(f"\n📤 Sending status update: {status}")
+        if self._verbose:
+            print(f"\n📤 Sending status update: {status}")
         
         # Convert status to code
-        status_code = {
-            'offline': 0,
-            'online': 1,
-            'error': 2
-        }.get(status, 1)
+        status_code = protocol.STATUS_CODES.get(status, 1)
         
         # Use 255 for "not applicable"
         battery = battery_level if battery_level is not None else 255
         signal = signal_strength if signal_strength is not None else 255
         
-        payload = struct.pack('<BBB', status_code, battery, signal)
-        message = self._create_message(self.MSG_STATUS_UPDATE, payload)
+        frame = self._status_frame
+        message = bytearray(frame.size)
+        frame.pack_into(message, 0, self._msg_prefix[self.MSG_STATUS_UPDATE],
+                        status_code, battery, signal, 0)
+        self._seal_message(message)
         
-        topic = f"devices/{self.device_id}/binary"
-        self.client.publish(topic, message, qos=1)
+        if qos is None:
+            qos = self._default_telemetry_qos
+        self._transport.publish(self._binary_topic, message, qos=qos)
         
-        print(f"   ✓ Status: {status}, Battery: {battery_level}%, Signal: {signal_strength}%")
+        if self._verbose:
+            print(f"   ✓ Status: {status}, Battery: {battery_level}%, Signal: {signal_strength}%")
     
-    def send_telemetry(self, sensor_type: str, value: float):
+    def send_telemetry(self, sensor_type: str, value: float, qos: Optional[int] = None):
         """
         Send telemetry data
         
+        qos defaults to the client's telemetry QoS (0)
+        
         Binary Format:
         [0x03] [UUID: 16 bytes] [sensor_type: 1 byte] [value: 4 bytes float] [timestamp: 8 bytes] [CRC: 2 bytes]
         """
-        print(f"\n📤 Sending telemetry: {sensor_type} = {value}")
+        if self._verbose:
+            print(f"\n📤 Sending telemetry: {sensor_type} = {value}")
         
         # Convert sensor type to code
-        sensor_code = {
-            'temperature': 0,
-            'pressure': 1,
-            'humidity': 2,
-            'voltage': 3
-        }.get(sensor_type, 0)
+        sensor_code = protocol.SENSOR_CODES.get(sensor_type, 0)
         
         # ✅ FIX: Use milliseconds (not seconds)
-        timestamp = int(time.time() * 1000)
+        timestamp = time.time_ns() // 1_000_000
         
-        payload = struct.pack('<BfQ', sensor_code, value, timestamp)
-        message = self._create_message(self.MSG_TELEMETRY, payload)
+        frame = self._telem_frame
+        message = bytearray(frame.size)
+        frame.pack_into(message, 0, self._msg_prefix[self.MSG_TELEMETRY],
+                        sensor_code, value, timestamp, 0)
+        self._seal_message(message)
         
-        topic = f"devices/{self.device_id}/binary"
-        self.client.publish(topic, message, qos=1)
+        if qos is None:
+            qos = self._default_telemetry_qos
+        self._transport.publish(self._binary_topic, message, qos=qos)
         
-        print(f"   ✓ Sent {sensor_type} reading: {value} (timestamp: {timestamp})")
+        if self._verbose:
+            print(f"   ✓ Sent {sensor_type} reading: {value} (timestamp: {timestamp})")
     
     def send_error(self, error_code: int, error_message: str):
         """
@@ -172,37 +384,120 @@ class BinaryProtocolClient:
         Binary Format:
         [0x04] [UUID: 16 bytes] [error_code: 4 bytes] [message: variable UTF-8] [CRC: 2 bytes]
         """
-        print(f"\n📤 Sending error: Code {error_code} - {error_message}")
+        if self._verbose:
+            print(f"\n📤 Sending error: Code {error_code} - {error_message}")
         
         message_bytes = error_message.encode('utf-8')
-        payload = struct.pack('<I', error_code) + message_bytes
-        message = self._create_message(self.MSG_ERROR, payload)
+        text_offset = self._PAYLOAD_OFFSET + self._ERR_FMT.size
+        message = self._new_message(self.MSG_ERROR, self._ERR_FMT.size + len(message_bytes))
+        self._ERR_FMT.pack_into(message, self._PAYLOAD_OFFSET, error_code)
+        message[text_offset:text_offset + len(message_bytes)] = message_bytes
+        self._seal_message(message)
         
-        topic = f"devices/{self.device_id}/binary"
-        self.client.publish(topic, message, qos=1)
+        self._transport.publish(self._binary_topic, message, qos=1)
         
-        print(f"   ✓ Error report sent")
+        if self._verbose:
+            print(f"   ✓ Error report sent")
     
-    def _create_message(self, message_type: int, payload: bytes) -> bytes:
-        """
-        Create complete binary message with header, device ID, payload, and checksum
+    def send_batch(self, items):
         """
-        # Header
-        header = struct.pack('B', message_type)
+        Send several messages in a single MQTT publish
         
-        # Device ID (UUID as 16 bytes) - using Kotlin's byte order
-        device_id_bytes = self.device_id.bytes
+        Each item is a tuple naming the message kind followed by the same
+        arguments as the matching send_* method:
+            ("piston", piston_number, is_active)
+            ("status", status, battery_level, signal_strength)
+            ("telemetry", sensor_type, value)
         
-        # Combine header + device ID + payload
-        data = header + device_id_bytes + payload
+        Binary Format:
+        [0x10] [UUID: 16 bytes] [count: 1 byte]
+               ([type: 1 byte] [length: 2 bytes] [payload: length bytes]) * count
+               [CRC: 2 bytes]
+        """
+        entries = [self._batch_entry(kind, *args) for kind, *args in items]
+        if not 0 < len(entries) <= 255:
+            raise ValueError(f"Batch must contain 1-255 messages, got {len(entries)}")
+        
+        if self._verbose:
+            print(f"\n📤 Sending batch of {len(entries)} messages")
+        
+        item_header = self._BATCH_ITEM_FMT.size
+        size = self._BATCH_COUNT_FMT.size + sum(item_header + len(p) for _, p in entries)
+        message = self._new_message(self.MSG_BATCH, size)
+        
+        offset = self._PAYLOAD_OFFSET
+        self._BATCH_COUNT_FMT.pack_into(message, offset, len(entries))
+        offset += self._BATCH_COUNT_FMT.size
+        for message_type, payload in entries:
+            self._BATCH_ITEM_FMT.pack_into(message, offset, message_type, len(payload))
+            offset += item_header
+            message[offset:offset + len(payload)] = payload
+            offset += len(payload)
+        self._seal_message(message)
+        
+        # Only piston state changes need delivery confirmation
+        needs_ack = any(t == self.MSG_PISTON_STATE for t, _ in entries)
+        qos = 1 if needs_ack else self._default_telemetry_qos
+        self._transport.publish(self._binary_topic, message, qos=qos)
+        
+        if self._verbose:
+            print(f"   ✓ Sent {len(message)} bytes in one publish")
+    
+    def _batch_entry(self, kind: str, *args) -> tuple:
+        """Encode one batch item as (message_type, payload)"""
+        if kind == "piston":
+            piston_number, is_active = args
+            timestamp = time.time_ns() // 1_000_000
+            return self.MSG_PISTON_STATE, self._PISTON_FMT.pack(
+                piston_number, 1 if is_active else 0, timestamp)
+        
+        if kind == "status":
+            status, battery_level, signal_strength = (args + (None, None))[:3]
+            status_code = protocol.STATUS_CODES.get(status, 1)
+            battery = battery_level if battery_level is not None else 255
+            signal = signal_strength if signal_strength is not None else 255
+            return self.MSG_STATUS_UPDATE, self._STATUS_FMT.pack(status_code, battery, signal)
+        
+        if kind == "telemetry":
+            sensor_type, value = args
+            sensor_code = protocol.SENSOR_CODES.get(sensor_type, 0)
+            timestamp = time.time_ns() // 1_000_000
+            return self.MSG_TELEMETRY, self._TELEM_FMT.pack(sensor_code, value, timestamp)
+        
+        raise ValueError(f"Unknown batch item kind: {kind}")
+    
+    def _new_message(self, message_type: int, payload_size: int) -> bytearray:
+        """
+        Allocate a complete message buffer with header and device ID filled in
         
+        The caller packs its payload at _PAYLOAD_OFFSET and then calls
+        _seal_message, so each message is built in a single allocation.
+        """
+        buf = bytearray(self._PAYLOAD_OFFSET + payload_size + self._checksum_fmt.size)
+        # Header + device ID (UUID as 16 bytes, Kotlin's byte order), precomputed
+        buf[:self._PAYLOAD_OFFSET] = self._msg_prefix[message_type]
+        return buf
+    
+    def _seal_message(self, buf: bytearray) -> bytearray:
+        """Write the checksum of everything before the checksum field (little-endian)"""
+        fmt = self._checksum_fmt
+        end = len(buf) - fmt.size
         # ✅ FIX: Calculate CRC16 checksum (matches Kotlin exactly)
-        checksum = self._calculate_crc16(data)
-        
-        # Append checksum (little-endian)
-        return data + struct.pack('<H', checksum)
+        # Resume from the precomputed header + UUID state instead of
+        # re-running the checksum over the 17 prefix bytes
+        crc = self._prefix_checksum[buf[0]]
+        fmt.pack_into(buf, end, self._checksum(memoryview(buf)[self._PAYLOAD_OFFSET:end], crc))
+        return buf
+    
+    def _create_message(self, message_type: int, payload: bytes) -> bytearray:
+        """
+        Create complete binary message with header, device ID, payload, and checksum
+        """
+        buf = self._new_message(message_type, len(payload))
+        buf[self._PAYLOAD_OFFSET:self._PAYLOAD_OFFSET + len(payload)] = payload
+        return self._seal_message(buf)
     
-    def _calculate_crc16(self, data: bytes) -> int:
+    def _calculate_crc16(self, data: bytes, crc: int = 0xFFFF) -> int:
         """
         Calculate CRC16 checksum - FIXED to match Kotlin backend exactly
         
@@ -220,41 +515,47 @@ class BinaryProtocolClient:
             }
         }
         ```
-        """
-        crc = 0xFFFF
         
-        for byte in data:
-            # ✅ FIX: Python bytes are already 0-255, no need to mask
-            # But we need to ensure it's treated as unsigned
-            crc ^= byte
-            
-            for _ in range(8):
-                if crc & 0x0001:
-                    crc = (crc >> 1) ^ 0x8005
-                else:
-                    crc >>= 1
-        
-        # ✅ FIX: Mask to 16 bits (matches Kotlin's Short)
-        return crc & 0xFFFF
+        Implemented in binary_protocol.crc16 (shared with the monitor). Pass
+        the result for earlier bytes as crc to continue a checksum over later ones.
+        """
+        return protocol.crc16(data, crc)
+    
+    @staticmethod
+    def _calculate_crc32(data: bytes, crc: int = 0) -> int:
+        """CRC-32 checksum for protocol V2 frames (matches java.util.zip.CRC32)"""
+        return zlib.crc32(data, crc)
     
     def _parse_command(self, data: bytes) -> Optional[dict]:
         """Parse binary command received from backend"""
-        if len(data) < 19:  # Minimum size
+        if len(data) < protocol.MIN_FRAME_SIZE:
             return None
         
-        # Extract header
-        message_type = data[0]
+        # Slice through a view so header/ID/payload/CRC reads don't copy
+        mv = memoryview(data)
+        
+        # Extract header (message type + protocol version bit)
+        header = mv[0]
+        message_type = header & self._MSG_TYPE_MASK
+        if header & self.PROTOCOL_V2_FLAG:
+            checksum_fmt, checksum = self._CRC32_FMT, self._calculate_crc32
+        else:
+            checksum_fmt, checksum = self._CRC_FMT, self._calculate_crc16
+        end = len(mv) - checksum_fmt.size
+        if end < self._PAYLOAD_OFFSET:
+            return None
         
-        # Extract device ID
-        device_id_bytes = data[1:17]
-        device_id = uuid.UUID(bytes=device_id_bytes)
+        # Only commands addressed to this device are handled (compared as raw
+        # bytes; no UUID object is built)
+        if mv[1:self._PAYLOAD_OFFSET] != self._uuid_bytes:
+            return None
         
-        # Extract payload
-        payload = data[17:-2]
+        # Extract payload (view; fields below are read in place with unpack_from)
+        payload = mv[self._PAYLOAD_OFFSET:end]
         
         # Verify checksum
-        received_checksum = struct.unpack('<H', data[-2:])[0]
-        calculated_checksum = self._calculate_crc16(data[:-2])
+        received_checksum = checksum_fmt.unpack_from(mv, end)[0]
+        calculated_checksum = checksum(mv[:end])
         
         if received_checksum != calculated_checksum:
             print(f"⚠️ Checksum mismatch! Received: {received_checksum:04x}, Calculated: {calculated_checksum:04x}")
@@ -262,7 +563,7 @@ class BinaryProtocolClient:
         
         # Parse based on message type
         if message_type == self.MSG_PISTON_STATE and len(payload) >= 2:
-            piston_num, state = struct.unpack('<BB', payload[:2])
+            piston_num, state = self._PARSE_PISTON.unpack_from(mv, self._PAYLOAD_OFFSET)
             return {
                 'type': 'piston_command',
                 'piston': piston_num,
@@ -272,9 +573,31 @@ class BinaryProtocolClient:
         return {'type': 'unknown', 'data': payload.hex()}
 
 
+def schedule_every(period: float, fn, stop: threading.Event) -> threading.Thread:
+    """
+    Call fn every `period` seconds on a daemon thread until `stop` is set
+    
+    Deadlines advance by a fixed step, so a slow call shortens the next wait
+    instead of pushing every later call back.
+    """
+    def run():
+        deadline = time.monotonic()
+        while not stop.is_set():
+            fn()
+            deadline += period
+            stop.wait(max(0.0, deadline - time.monotonic()))
+    
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
 def simulate_device_activity():
     """
     Simulate a device sending various messages
+    
+    Each message kind runs on its own schedule, so publishes are never
+    serialized behind sleeps for unrelated messages.
     """
     # Use the test device ID from the database
     DEVICE_ID = "550e8400-e29b-41d4-a716-446655440000"
@@ -283,50 +606,45 @@ def simulate_device_activity():
     print("🤖 Binary Protocol Simulation")
     print("=" * 60)
     
-    client = BinaryProtocolClient(DEVICE_ID)
+    client = BinaryProtocolClient(DEVICE_ID, verbose=True)
     client.connect()
     
+    stop = threading.Event()
+    active_pistons = []
+    
+    def send_status():
+        battery = random.randint(85, 100)
+        signal = random.randint(70, 100)
+        client.send_status("online", battery, signal)
+    
+    def send_telemetry():
+        # One publish per reading: not every consumer reads MSG_BATCH yet
+        temp = round(random.uniform(20.0, 30.0), 2)
+        humidity = round(random.uniform(40.0, 70.0), 2)
+        client.send_telemetry("temperature", temp)
+        client.send_telemetry("humidity", humidity)
+    
+    def cycle_piston():
+        # Deactivate the previous piston, then activate a random one
+        if active_pistons:
+            client.send_piston_state(active_pistons.pop(), False)
+        piston = random.randint(1, 8)
+        client.send_piston_state(piston, True)
+        active_pistons.append(piston)
+    
     try:
         print("\n⏳ Starting simulation (Ctrl+C to stop)...\n")
-        time.sleep(2)
         
-        cycle = 0
+        schedule_every(10.0, send_status, stop)
+        schedule_every(3.0, send_telemetry, stop)
+        schedule_every(5.0, cycle_piston, stop)
+        
         while True:
-            cycle += 1
-            print(f"\n{'='*60}")
-            print(f"🔄 Cycle {cycle}")
-            print(f"{'='*60}")
-            
-            # Send status update
-            battery = random.randint(85, 100)
-            signal = random.randint(70, 100)
-            client.send_status("online", battery, signal)
-            time.sleep(1)
-            
-            # Activate a random piston
-            piston = random.randint(1, 8)
-            client.send_piston_state(piston, True)
-            time.sleep(1)
-            
-            # Send telemetry
-            temp = round(random.uniform(20.0, 30.0), 2)
-            client.send_telemetry("temperature", temp)
-            time.sleep(1)
-            
-            humidity = round(random.uniform(40.0, 70.0), 2)
-            client.send_telemetry("humidity", humidity)
-            time.sleep(1)
-            
-            # Deactivate the piston
-            client.send_piston_state(piston, False)
-            time.sleep(1)
-            
-            # Wait before next cycle
-            print(f"\n⏸  Waiting 5 seconds before next cycle...")
-            time.sleep(5)
+            time.sleep(1)  # publishing happens on the scheduler threads
             
     except KeyboardInterrupt:
         print("\n\n🛑 Stopping simulation...")
+        stop.set()
         client.disconnect()
         print("✅ Disconnected cleanly")
 
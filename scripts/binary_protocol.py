@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Binary Protocol Helpers
+Shared by the device client and the MQTT monitor: message constants,
+payload layouts, and a CRC16 computed exactly like the Kotlin backend
+(poly 0x8005, reflected shift, init 0xFFFF, no final xor).
+
+Frame: [Header: 1 byte] [Device ID: 16 bytes] [Payload: variable] [Checksum: 2 bytes]
+"""
+
+import socket
+import struct
+
+try:
+    import crcmod  # optional: C-implemented CRC
+except ImportError:
+    crcmod = None
+
+# Wire codes for status and sensor names (must match backend)
+STATUS_CODES = {'offline': 0, 'online': 1, 'error': 2}
+SENSOR_CODES = {'temperature': 0, 'pressure': 1, 'humidity': 2, 'voltage': 3}
+
+# Message type constants (must match backend)
+MSG_PISTON_STATE = 0x01
+MSG_STATUS_UPDATE = 0x02
+MSG_TELEMETRY = 0x03
+MSG_ERROR = 0x04
+MSG_BATCH = 0x10
+
+# Header bit selecting protocol V2 (CRC-32 checksum). V2 uses the IEEE/zlib
+# CRC-32 (zlib.crc32 here, java.util.zip.CRC32 in the backend), not CRC32C:
+# both ends compute it natively with no extra dependency. Keep in sync with
+# BinaryProtocolParser.VERSION_V2_FLAG.
+PROTOCOL_V2_FLAG = 0x80
+MSG_TYPE_MASK = 0x7F
+
+# Header (1 byte) + device ID (16 bytes) precede every payload
+HEADER_SIZE = 17
+
+# Precompiled payload and checksum layouts (little-endian, like the backend)
+PISTON_FMT = struct.Struct('<BBQ')
+STATUS_FMT = struct.Struct('<BBB')
+TELEMETRY_FMT = struct.Struct('<BfQ')
+ERROR_FMT = struct.Struct('<I')
+CRC16_FMT = struct.Struct('<H')
+CRC32_FMT = struct.Struct('<I')
+BATCH_COUNT_FMT = struct.Struct('B')
+BATCH_ITEM_FMT = struct.Struct('<BH')
+
+# Smallest V1 frame: header + device ID + CRC16, no payload
+MIN_FRAME_SIZE = HEADER_SIZE + CRC16_FMT.size
+
+
+def _crc16_table_entry(byte: int) -> int:
+    """
+    Run the bit-serial CRC16 (poly 0x8005, reflected shift) over one byte.
+    Used once at import to build the byte-wise lookup table.
+    """
+    crc = byte
+    for _ in range(8):
+        if crc & 0x0001:
+            crc = (crc >> 1) ^ 0x8005
+        else:
+            crc >>= 1
+    return crc
+
+
+def _crc16_slice_tables(table: tuple) -> tuple:
+    """
+    Derive the slice-by-8 tables T0..T7 from the byte-wise table
+    
+    Tk[b] is the CRC contribution of byte b followed by k zero bytes, so
+    eight bytes can be folded with eight independent lookups.
+    """
+    tables = [table]
+    for _ in range(7):
+        prev = tables[-1]
+        tables.append(tuple((prev[b] >> 8) ^ table[prev[b] & 0xFF] for b in range(256)))
+    return tuple(tables)
+
+
+# Byte-wise CRC16 lookup table (Sarwate), derived from the same bit loop
+CRC16_TABLE = tuple(_crc16_table_entry(i) for i in range(256))
+_CRC16_SLICE_TABLES = _crc16_slice_tables(CRC16_TABLE)
+
+# Inputs at least this long take the slice-by-8 path in crc16_lut
+_CRC16_SLICE_MIN = 32
+
+
+def crc16_lut(data: bytes, crc: int = 0xFFFF) -> int:
+    """Pure-Python CRC16 using the byte-wise lookup table"""
+    table = CRC16_TABLE  # local lookup inside the byte loop
+    
+    # Longer inputs (error reports, batches): fold 8 bytes per iteration.
+    # Only the first two bytes of each block mix with the 16-bit CRC.
+    if len(data) >= _CRC16_SLICE_MIN:
+        t0, t1, t2, t3, t4, t5, t6, t7 = _CRC16_SLICE_TABLES
+        blocks = len(data) & ~7
+        it = iter(data[:blocks])
+        for b0, b1, b2, b3, b4, b5, b6, b7 in zip(it, it, it, it, it, it, it, it):
+            crc = (t7[b0 ^ (crc & 0xFF)] ^ t6[b1 ^ (crc >> 8)] ^ t5[b2] ^ t4[b3]
+                   ^ t3[b4] ^ t2[b5] ^ t1[b6] ^ t0[b7])
+        data = data[blocks:]
+    
+    # One table lookup per byte instead of 8 shift/xor iterations.
+    # The table is built from the bit loop, so output is identical.
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    
+    # Mask to 16 bits (matches Kotlin's Short)
+    return crc & 0xFFFF
+
+
+def _load_crc16_ext():
+    """
+    Build the crcmod CRC16 function, or return None if unavailable.
+    
+    crcmod bit-reverses the polynomial when rev=True, so 0xA001 is passed
+    to get the 0x8005 right-shift used by the backend. The result is checked
+    against the table version once so a mismatch can never reach the wire.
+    """
+    if crcmod is None:
+        return None
+    
+    fn = crcmod.mkCrcFun(0x1A001, initCrc=0xFFFF, rev=True, xorOut=0x0000)
+    check = bytes(range(256))
+    if fn(check) != crc16_lut(check):
+        return None
+    return fn
+
+
+_crc16_ext = _load_crc16_ext()
+
+
+def set_tcp_nodelay(client, userdata, sock):
+    """
+    paho on_socket_open callback that disables Nagle's algorithm
+    
+    Frames are 20-300 bytes, so without TCP_NODELAY they can sit in the
+    kernel for tens of milliseconds waiting to be coalesced. Runs again on
+    every reconnect; websocket transports have no TCP socket to tune.
+    """
+    if isinstance(sock, socket.socket):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+def crc16(data: bytes, crc: int = 0xFFFF) -> int:
+    """
+    CRC16 of data, continuing from crc (the result for earlier bytes)
+    
+    Uses the crcmod C extension when it is installed and verified,
+    otherwise the pure-Python table loop.
+    """
+    if _crc16_ext is not None:
+        return _crc16_ext(data, crc)
+    return crc16_lut(data, crc)
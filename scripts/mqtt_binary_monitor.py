@@ -8,70 +8,130 @@ the binary protocol format.
 """
 
 import paho.mqtt.client as mqtt
-import struct
+import time
 import uuid
 from datetime import datetime
 from typing import Optional
 import sys
+import zlib
+
+import binary_protocol as protocol
+from render_thread import RenderThread
+
+# Color codes for terminal
+RESET = '\033[0m'
+BOLD = '\033[1m'
+GREEN = '\033[92m'
+YELLOW = '\033[93m'
+RED = '\033[91m'
+BLUE = '\033[94m'
+CYAN = '\033[96m'
+MAGENTA = '\033[95m'
+
 
 class BinaryMessageDecoder:
     """Decodes binary protocol messages"""
     
     MSG_TYPES = {
-        0x01: "PISTON_STATE",
-        0x02: "STATUS_UPDATE",
-        0x03: "TELEMETRY",
-        0x04: "ERROR"
+        protocol.MSG_PISTON_STATE: "PISTON_STATE",
+        protocol.MSG_STATUS_UPDATE: "STATUS_UPDATE",
+        protocol.MSG_TELEMETRY: "TELEMETRY",
+        protocol.MSG_ERROR: "ERROR",
+        protocol.MSG_BATCH: "BATCH"
     }
     
-    SENSOR_TYPES = {
-        0: "temperature",
-        1: "pressure",
-        2: "humidity",
-        3: "voltage"
-    }
+    # Code -> name, derived from the codes the device client sends
+    SENSOR_TYPES = {code: name for name, code in protocol.SENSOR_CODES.items()}
+    STATUS_CODES = {code: name for name, code in protocol.STATUS_CODES.items()}
     
-    STATUS_CODES = {
-        0: "offline",
-        1: "online",
-        2: "error"
-    }
+    # Precompiled payload layouts (shared with the device client), read in
+    # place with unpack_from
+    _PISTON_FMT = protocol.PISTON_FMT
+    _STATUS_FMT = protocol.STATUS_FMT
+    _TELEM_FMT = protocol.TELEMETRY_FMT
+    _ERR_FMT = protocol.ERROR_FMT
+    _CRC_FMT = protocol.CRC16_FMT
+    _CRC32_FMT = protocol.CRC32_FMT
+    _BATCH_COUNT_FMT = protocol.BATCH_COUNT_FMT
+    _BATCH_ITEM_FMT = protocol.BATCH_ITEM_FMT
     
-    def __init__(self):
+    def __init__(self, verify_crc: bool = True):
+        """
+        Args:
+            verify_crc: Check each message's checksum (CRC16, or CRC-32 for
+                        V2 frames). Turning it off saves the checksum pass on
+                        trusted links (e.g. a local broker); keep it on for
+                        devices on cellular/LoRa links.
+        """
         self.message_count = 0
         self.crc_errors = 0
         self.decode_errors = 0
+        self.verify_crc = verify_crc
+        self._crc_status = 'CRC Valid' if verify_crc else 'CRC Not Checked'
+        
+        # Local UTC offset of the last 15-minute bucket seen: device timestamps
+        # are rendered with integer math instead of datetime.fromtimestamp +
+        # strftime, and the offset is only looked up again when they leave it
+        self._offset_bucket = None
+        self._offset_ms = 0
+        
+        # Display form of each device ID seen so far
+        self._short_ids = {}
+        
+        # Payload decoder per message type
+        self._decoders = {
+            protocol.MSG_PISTON_STATE: self._decode_piston_state,
+            protocol.MSG_STATUS_UPDATE: self._decode_status_update,
+            protocol.MSG_TELEMETRY: self._decode_telemetry,
+            protocol.MSG_ERROR: self._decode_error,
+            protocol.MSG_BATCH: self._decode_batch,
+        }
     
     def calculate_crc16(self, data: bytes) -> int:
-        """Calculate CRC16 checksum"""
-        crc = 0xFFFF
-        for byte_val in data:
-            crc ^= byte_val
-            for _ in range(8):
-                if crc & 0x0001:
-                    crc = (crc >> 1) ^ 0x8005
-                else:
-                    crc >>= 1
-        return crc & 0xFFFF
+        """Calculate CRC16 checksum (table-driven, shared with the device client)"""
+        return protocol.crc16(data)
     
-    def verify_crc(self, data: bytes) -> bool:
-        """Verify message CRC"""
-        if len(data) < 19:  # Minimum message size
-            return False
-        
-        # CRC is last 2 bytes
-        received_crc = struct.unpack('<H', data[-2:])[0]
-        # Calculate CRC on everything except the CRC itself
-        calculated_crc = self.calculate_crc16(data[:-2])
+    def _short_id(self, device_id: bytes) -> str:
+        """Shortened device ID for display, formatted once per device"""
+        short = self._short_ids.get(device_id)
+        if short is None:
+            # The first 8 hex digits of the raw bytes are the first UUID group
+            short = self._short_ids[device_id] = device_id[:4].hex() + '...'
+        return short
+    
+    def _utc_offset_ms(self, timestamp_ms: int) -> int:
+        """
+        Local UTC offset in effect at timestamp_ms
         
-        return received_crc == calculated_crc
+        DST and zone changes take effect on quarter-hour boundaries, so one
+        lookup covers every timestamp in the same 15-minute bucket.
+        """
+        seconds = timestamp_ms // 1000
+        bucket = seconds // 900
+        if bucket != self._offset_bucket:
+            try:
+                offset = time.localtime(seconds).tm_gmtoff
+            except (OverflowError, OSError, ValueError):
+                # Outside the platform's time_t range: use the current offset
+                offset = time.localtime().tm_gmtoff
+            self._offset_bucket = bucket
+            self._offset_ms = offset * 1000
+        return self._offset_ms
+    
+    def _format_time(self, timestamp_ms: int) -> str:
+        """Render epoch milliseconds as local HH:MM:SS.mmm"""
+        seconds, ms = divmod(timestamp_ms + self._utc_offset_ms(timestamp_ms), 1000)
+        return f"{seconds // 3600 % 24:02d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}.{ms:03d}"
     
     def decode(self, data: bytes) -> Optional[dict]:
         """Decode binary message"""
         self.message_count += 1
         
         try:
-            if len(data) < 19:
+            # Slice through a view so header/ID/payload/CRC reads don't copy
+            data = memoryview(data)
+            
+            if len(data) < protocol.MIN_FRAME_SIZE:
                 self.decode_errors += 1
                 return {
                     'error': 'Message too short',
@@ -79,44 +139,55 @@ class BinaryMessageDecoder:
                     'hex': data.hex()
                 }
             
-            # Verify CRC
-            if not self.verify_crc(data):
-                self.crc_errors += 1
-                received_crc = struct.unpack('<H', data[-2:])[0]
-                calculated_crc = self.calculate_crc16(data[:-2])
+            # Parse header (message type + protocol version bit); V2 frames
+            # end in a CRC-32 instead of a CRC16
+            header = data[0]
+            msg_type = header & protocol.MSG_TYPE_MASK
+            if header & protocol.PROTOCOL_V2_FLAG:
+                checksum_fmt, checksum = self._CRC32_FMT, zlib.crc32
+            else:
+                checksum_fmt, checksum = self._CRC_FMT, self.calculate_crc16
+            end = len(data) - checksum_fmt.size
+            if end < protocol.HEADER_SIZE:
+                self.decode_errors += 1
                 return {
-                    'error': 'CRC mismatch',
-                    'received_crc': f"0x{received_crc:04x}",
-                    'calculated_crc': f"0x{calculated_crc:04x}",
+                    'error': 'Message too short',
+                    'size': len(data),
                     'hex': data.hex()
                 }
             
-            # Parse header
-            msg_type = data[0]
+            # Verify the checksum against everything before it, computed
+            # once and reused for both the check and the error report
+            crc = checksum_fmt.unpack_from(data, end)[0]
+            digits = checksum_fmt.size * 2
+            if self.verify_crc:
+                calculated_crc = checksum(data[:end])
+                if crc != calculated_crc:
+                    self.crc_errors += 1
+                    return {
+                        'error': 'CRC mismatch',
+                        'received_crc': f"0x{crc:0{digits}x}",
+                        'calculated_crc': f"0x{calculated_crc:0{digits}x}",
+                        'hex': data.hex()
+                    }
             
-            # Parse UUID (16 bytes, big-endian)
-            device_uuid = uuid.UUID(bytes=data[1:17])
+            # Device ID (16 bytes, big-endian); kept as raw bytes since only
+            # the unknown-type report needs a full UUID
+            device_id = bytes(data[1:protocol.HEADER_SIZE])
             
             # Parse payload
-            payload = data[17:-2]
-            
-            # CRC
-            crc = struct.unpack('<H', data[-2:])[0]
+            payload = data[protocol.HEADER_SIZE:end]
             
             # Decode based on message type
-            if msg_type == 0x01:  # PISTON_STATE
-                return self._decode_piston_state(device_uuid, payload, crc)
-            elif msg_type == 0x02:  # STATUS_UPDATE
-                return self._decode_status_update(device_uuid, payload, crc)
-            elif msg_type == 0x03:  # TELEMETRY
-                return self._decode_telemetry(device_uuid, payload, crc)
-            elif msg_type == 0x04:  # ERROR
-                return self._decode_error(device_uuid, payload, crc)
+            decoder = self._decoders.get(msg_type)
+            if decoder is not None:
+                # Checksum shown at its full width (4 or 8 hex digits)
+                return decoder(device_id, payload, f"0x{crc:0{digits}x}")
             else:
                 return {
                     'error': 'Unknown message type',
                     'type': f"0x{msg_type:02x}",
-                    'device_id': str(device_uuid),
+                    'device_id': str(uuid.UUID(bytes=device_id)),
                     'hex': data.hex()
                 }
         
@@ -127,221 +198,290 @@ class BinaryMessageDecoder:
                 'hex': data.hex()
             }
     
-    def _decode_piston_state(self, device_uuid: uuid.UUID, payload: bytes, crc: int) -> dict:
+    def _decode_piston_state(self, device_id: bytes, payload: bytes, crc: str) -> dict:
         """Decode piston state message"""
-        if len(payload) < 10:
+        if len(payload) < self._PISTON_FMT.size:
             return {'error': 'Invalid piston state payload size', 'size': len(payload)}
         
-        piston_num, state_byte = struct.unpack('<BB', payload[0:2])
-        timestamp_ms = struct.unpack('<Q', payload[2:10])[0]
-        
-        # Convert timestamp from milliseconds to datetime
-        timestamp = datetime.fromtimestamp(timestamp_ms / 1000)
+        piston_num, state_byte, timestamp_ms = self._PISTON_FMT.unpack_from(payload)
         
         return {
             'type': 'PISTON_STATE',
-            'device_id': str(device_uuid)[:8] + '...',
+            'device_id': self._short_id(device_id),
             'piston': piston_num,
             'state': 'ACTIVE' if state_byte == 1 else 'INACTIVE',
-            'timestamp': timestamp.strftime('%H:%M:%S.%f')[:-3],
-            'crc': f"0x{crc:04x}",
-            '✓': 'CRC Valid'
+            'timestamp': self._format_time(timestamp_ms),
+            'crc': crc,
+            '✓': self._crc_status
         }
     
-    def _decode_status_update(self, device_uuid: uuid.UUID, payload: bytes, crc: int) -> dict:
+    def _decode_status_update(self, device_id: bytes, payload: bytes, crc: str) -> dict:
         """Decode status update message"""
-        if len(payload) < 3:
+        if len(payload) < self._STATUS_FMT.size:
             return {'error': 'Invalid status update payload size', 'size': len(payload)}
         
-        status_code, battery, signal = struct.unpack('<BBB', payload[0:3])
+        status_code, battery, signal = self._STATUS_FMT.unpack_from(payload)
         
         return {
             'type': 'STATUS_UPDATE',
-            'device_id': str(device_uuid)[:8] + '...',
+            'device_id': self._short_id(device_id),
             'status': self.STATUS_CODES.get(status_code, f"unknown({status_code})"),
             'battery': f"{battery}%" if battery != 255 else "N/A",
             'signal': f"{signal}%" if signal != 255 else "N/A",
-            'crc': f"0x{crc:04x}",
-            '✓': 'CRC Valid'
+            'crc': crc,
+            '✓': self._crc_status
         }
     
-    def _decode_telemetry(self, device_uuid: uuid.UUID, payload: bytes, crc: int) -> dict:
+    def _decode_telemetry(self, device_id: bytes, payload: bytes, crc: str) -> dict:
         """Decode telemetry message"""
-        if len(payload) < 13:
+        if len(payload) < self._TELEM_FMT.size:
             return {'error': 'Invalid telemetry payload size', 'size': len(payload)}
         
-        sensor_code = payload[0]
-        value = struct.unpack('<f', payload[1:5])[0]
-        timestamp_ms = struct.unpack('<Q', payload[5:13])[0]
-        
-        # Convert timestamp from milliseconds to datetime
-        timestamp = datetime.fromtimestamp(timestamp_ms / 1000)
+        sensor_code, value, timestamp_ms = self._TELEM_FMT.unpack_from(payload)
         
         sensor_name = self.SENSOR_TYPES.get(sensor_code, f"unknown({sensor_code})")
         
         return {
             'type': 'TELEMETRY',
-            'device_id': str(device_uuid)[:8] + '...',
+            'device_id': self._short_id(device_id),
             'sensor': sensor_name,
             'value': f"{value:.2f}",
-            'timestamp': timestamp.strftime('%H:%M:%S.%f')[:-3],
-            'crc': f"0x{crc:04x}",
-            '✓': 'CRC Valid'
+            'timestamp': self._format_time(timestamp_ms),
+            'crc': crc,
+            '✓': self._crc_status
         }
     
-    def _decode_error(self, device_uuid: uuid.UUID, payload: bytes, crc: int) -> dict:
+    def _decode_error(self, device_id: bytes, payload: bytes, crc: str) -> dict:
         """Decode error message"""
-        if len(payload) < 4:
+        if len(payload) < self._ERR_FMT.size:
             return {'error': 'Invalid error payload size', 'size': len(payload)}
         
-        error_code = struct.unpack('<I', payload[0:4])[0]
-        error_msg = payload[4:].decode('utf-8', errors='replace')
+        error_code = self._ERR_FMT.unpack_from(payload)[0]
+        error_msg = bytes(payload[4:]).decode('utf-8', errors='replace')
         
         return {
             'type': 'ERROR',
-            'device_id': str(device_uuid)[:8] + '...',
+            'device_id': self._short_id(device_id),
             'code': error_code,
             'message': error_msg,
-            'crc': f"0x{crc:04x}",
-            '✓': 'CRC Valid'
+            'crc': crc,
+            '✓': self._crc_status
+        }
+    
+    def _decode_batch(self, device_id: bytes, payload: bytes, crc: str) -> dict:
+        """
+        Decode batch message: [count] ([type] [length] [payload]) * count
+        
+        Each item is decoded by the single-message decoder for its type.
+        """
+        if len(payload) < self._BATCH_COUNT_FMT.size:
+            return {'error': 'Invalid batch payload size', 'size': len(payload)}
+        
+        count = self._BATCH_COUNT_FMT.unpack_from(payload)[0]
+        offset = self._BATCH_COUNT_FMT.size
+        items = []
+        
+        for _ in range(count):
+            if offset + self._BATCH_ITEM_FMT.size > len(payload):
+                return {'error': 'Truncated batch payload', 'size': len(payload)}
+            msg_type, length = self._BATCH_ITEM_FMT.unpack_from(payload, offset)
+            offset += self._BATCH_ITEM_FMT.size
+            if offset + length > len(payload):
+                return {'error': 'Truncated batch payload', 'size': len(payload)}
+            item = payload[offset:offset + length]
+            offset += length
+            
+            # Batches don't nest
+            decoder = self._decoders.get(msg_type) if msg_type != protocol.MSG_BATCH else None
+            if decoder is not None:
+                items.append(decoder(device_id, item, crc))
+            else:
+                items.append({'error': 'Unknown message type', 'type': f"0x{msg_type:02x}"})
+        
+        return {
+            'type': 'BATCH',
+            'device_id': self._short_id(device_id),
+            'count': count,
+            'items': items,
+            'crc': crc,
+            '✓': self._crc_status
         }
 
 
 class MQTTBinaryMonitor:
     """MQTT monitor with binary protocol support"""
     
-    def __init__(self, broker: str = "localhost", port: int = 1883):
+    # Messages waiting for the render thread; the oldest are dropped beyond this
+    QUEUE_SIZE = 10000
+    
+    def __init__(self, broker: str = "localhost", port: int = 1883, verify_crc: bool = True):
         self.broker = broker
         self.port = port
-        self.decoder = BinaryMessageDecoder()
-        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, "binary-monitor")
+        self.decoder = BinaryMessageDecoder(verify_crc)
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, "binary-monitor")
         self.client.on_connect = self._on_connect
         self.client.on_message = self._on_message
+        self.client.on_socket_open = protocol.set_tcp_nodelay
+        
+        # paho's network thread only enqueues (topic, payload, receive time);
+        # decoding and terminal output happen on the render thread, so a slow
+        # terminal can't stall MQTT reads
+        self._renderer = RenderThread(self._render, self.QUEUE_SIZE)
         
-        # Color codes for terminal
-        self.COLORS = {
-            'RESET': '\033[0m',
-            'BOLD': '\033[1m',
-            'GREEN': '\033[92m',
-            'YELLOW': '\033[93m',
-            'RED': '\033[91m',
-            'BLUE': '\033[94m',
-            'CYAN': '\033[96m',
-            'MAGENTA': '\033[95m'
+        # Fixed, colored pieces of every message block, formatted once
+        self._block_top = self._color("═" * 70, BLUE)
+        self._block_title = self._color('📨 Message', BOLD)
+        self._block_rule = self._color("─" * 70, BLUE)
+        self._topic_label = self._color('📍 Topic:', CYAN)
+        self._size_label = self._color('📦 Size:', CYAN)
+        type_colors = {
+            'PISTON_STATE': MAGENTA,
+            'STATUS_UPDATE': GREEN,
+            'TELEMETRY': CYAN,
+            'ERROR': RED,
+            'BATCH': YELLOW
+        }
+        self._type_headers = {
+            msg_type: self._color(f"🔖 Type: {msg_type}", color)
+            for msg_type, color in type_colors.items()
         }
     
     def _color(self, text: str, color: str) -> str:
-        """Colorize text"""
-        return f"{self.COLORS.get(color, '')}{text}{self.COLORS['RESET']}"
+        """Colorize text with one of the module's color codes"""
+        return f"{color}{text}{RESET}"
     
-    def _on_connect(self, client, userdata, flags, rc):
+    def _on_connect(self, client, userdata, flags, reason_code, properties):
         """Handle MQTT connection"""
-        if rc == 0:
-            print(self._color("✅ Connected to MQTT broker", "GREEN"))
+        if reason_code == 0:
+            print(self._color("✅ Connected to MQTT broker", GREEN))
             # Subscribe to all device binary topics
             client.subscribe("devices/+/binary")
-            print(self._color("📡 Subscribed to: devices/+/binary", "CYAN"))
-            print(self._color("👀 Monitoring messages... (Ctrl+C to stop)\n", "YELLOW"))
+            print(self._color("📡 Subscribed to: devices/+/binary", CYAN))
+            print(self._color("👀 Monitoring messages... (Ctrl+C to stop)\n", YELLOW))
         else:
-            print(self._color(f"❌ Connection failed with code {rc}", "RED"))
+            print(self._color(f"❌ Connection failed with code {reason_code}", RED))
     
     def _on_message(self, client, userdata, msg):
-        """Handle incoming MQTT message"""
-        timestamp = datetime.now().strftime('%H:%M:%S.%f')[:-3]
-        
-        # Print separator
-        print(self._color("═" * 70, "BLUE"))
-        print(f"{self._color('📨 Message', 'BOLD')} | {timestamp}")
-        print(self._color("─" * 70, "BLUE"))
+        """Handle incoming MQTT message (network thread: enqueue only)"""
+        self._renderer.put(msg.topic, msg.payload, time.time())
+    
+    def _render(self, topic: str, payload: bytes, received_at: float):
+        """Decode one message and print it"""
+        timestamp = datetime.fromtimestamp(received_at).strftime('%H:%M:%S.%f')[:-3]
         
-        # Print topic and size
-        print(f"{self._color('📍 Topic:', 'CYAN')} {msg.topic}")
-        print(f"{self._color('📦 Size:', 'CYAN')}  {len(msg.payload)} bytes")
-        print()
+        # The whole block is collected and written with one call, instead of
+        # a print() (and terminal write) per line
+        out = [
+            self._block_top,
+            f"{self._block_title} | {timestamp}",
+            self._block_rule,
+            f"{self._topic_label} {topic}",
+            f"{self._size_label}  {len(payload)} bytes",
+            "",
+        ]
         
         # Decode message
-        decoded = self.decoder.decode(msg.payload)
+        decoded = self.decoder.decode(payload)
         
         if 'error' in decoded:
             # Error case
-            print(self._color(f"❌ {decoded['error']}", "RED"))
+            out.append(self._color(f"❌ {decoded['error']}", RED))
             if 'received_crc' in decoded:
-                print(f"   Received CRC:   {decoded['received_crc']}")
-                print(f"   Calculated CRC: {decoded['calculated_crc']}")
+                out.append(f"   Received CRC:   {decoded['received_crc']}")
+                out.append(f"   Calculated CRC: {decoded['calculated_crc']}")
             if 'hex' in decoded:
-                print(f"   Raw Hex: {decoded['hex'][:80]}...")
+                out.append(f"   Raw Hex: {decoded['hex'][:80]}...")
         else:
             # Successful decode
             msg_type = decoded.get('type', 'UNKNOWN')
-            type_colors = {
-                'PISTON_STATE': 'MAGENTA',
-                'STATUS_UPDATE': 'GREEN',
-                'TELEMETRY': 'CYAN',
-                'ERROR': 'RED'
-            }
-            color = type_colors.get(msg_type, 'YELLOW')
-            
-            print(self._color(f"🔖 Type: {msg_type}", color))
-            print(f"🆔 Device: {decoded.get('device_id', 'N/A')}")
-            
-            # Print type-specific fields
-            if msg_type == 'PISTON_STATE':
-                print(f"🔧 Piston #{decoded['piston']}: {self._color(decoded['state'], 'BOLD')}")
-                print(f"⏰ Time: {decoded['timestamp']}")
+            header = self._type_headers.get(msg_type)
+            if header is None:
+                header = self._color(f"🔖 Type: {msg_type}", YELLOW)
             
-            elif msg_type == 'STATUS_UPDATE':
-                print(f"📊 Status: {decoded['status']}")
-                print(f"🔋 Battery: {decoded['battery']}")
-                print(f"📶 Signal: {decoded['signal']}")
+            out.append(header)
+            out.append(f"🆔 Device: {decoded.get('device_id', 'N/A')}")
             
-            elif msg_type == 'TELEMETRY':
-                print(f"🌡️  Sensor: {decoded['sensor']}")
-                print(f"📈 Value: {decoded['value']}")
-                print(f"⏰ Time: {decoded['timestamp']}")
-            
-            elif msg_type == 'ERROR':
-                print(f"⚠️  Code: {decoded['code']}")
-                print(f"💬 Message: {decoded['message']}")
+            if msg_type == 'BATCH':
+                out.append(f"📦 Messages: {decoded['count']}")
+                for i, item in enumerate(decoded['items'], 1):
+                    if 'error' in item:
+                        out.append(self._color(f"  [{i}] ❌ {item['error']}", RED))
+                        continue
+                    out.append(f"  [{i}] {item['type']}")
+                    self._render_fields(item, out, "      ")
+            else:
+                self._render_fields(decoded, out)
             
-            print(f"✅ {decoded.get('✓', 'Valid')}: {decoded.get('crc', 'N/A')}")
+            out.append(f"✅ {decoded.get('✓', 'Valid')}: {decoded.get('crc', 'N/A')}")
         
-        print()
+        out.append("")
+        sys.stdout.write("\n".join(out) + "\n")
+        sys.stdout.flush()
+    
+    def _render_fields(self, decoded: dict, out: list, indent: str = ""):
+        """Append the type-specific lines of a decoded message to out"""
+        msg_type = decoded['type']
+        
+        if msg_type == 'PISTON_STATE':
+            out.append(f"{indent}🔧 Piston #{decoded['piston']}: {self._color(decoded['state'], BOLD)}")
+            out.append(f"{indent}⏰ Time: {decoded['timestamp']}")
+        
+        elif msg_type == 'STATUS_UPDATE':
+            out.append(f"{indent}📊 Status: {decoded['status']}")
+            out.append(f"{indent}🔋 Battery: {decoded['battery']}")
+            out.append(f"{indent}📶 Signal: {decoded['signal']}")
+        
+        elif msg_type == 'TELEMETRY':
+            out.append(f"{indent}🌡️  Sensor: {decoded['sensor']}")
+            out.append(f"{indent}📈 Value: {decoded['value']}")
+            out.append(f"{indent}⏰ Time: {decoded['timestamp']}")
+        
+        elif msg_type == 'ERROR':
+            out.append(f"{indent}⚠️  Code: {decoded['code']}")
+            out.append(f"{indent}💬 Message: {decoded['message']}")
     
     def run(self):
         """Start monitoring"""
-        print(self._color("=" * 70, "BOLD"))
-        print(self._color("     🔍 MQTT BINARY PROTOCOL MONITOR", "BOLD"))
-        print(self._color("=" * 70, "BOLD"))
+        print(self._color("=" * 70, BOLD))
+        print(self._color("     🔍 MQTT BINARY PROTOCOL MONITOR", BOLD))
+        print(self._color("=" * 70, BOLD))
         print(f"Broker: {self.broker}:{self.port}")
-        print(self._color("=" * 70, "BOLD"))
+        print(self._color("=" * 70, BOLD))
         print()
         
         try:
+            self._renderer.start()
             self.client.connect(self.broker, self.port, 60)
             self.client.loop_forever()
         
         except KeyboardInterrupt:
-            print(self._color("\n\n👋 Stopping monitor...", "YELLOW"))
+            self._renderer.stop()
+            print(self._color("\n\n👋 Stopping monitor...", YELLOW))
             self._print_stats()
         
         except Exception as e:
-            print(self._color(f"\n❌ Error: {e}", "RED"))
+            print(self._color(f"\n❌ Error: {e}", RED))
         
         finally:
+            self._renderer.stop()
             self.client.disconnect()
     
     def _print_stats(self):
         """Print statistics"""
-        print(self._color("\n📊 Statistics:", "BOLD"))
+        print(self._color("\n📊 Statistics:", BOLD))
         print(f"   Total messages: {self.decoder.message_count}")
-        print(f"   CRC errors: {self._color(str(self.decoder.crc_errors), 'RED' if self.decoder.crc_errors > 0 else 'GREEN')}")
-        print(f"   Decode errors: {self._color(str(self.decoder.decode_errors), 'RED' if self.decoder.decode_errors > 0 else 'GREEN')}")
+        print(f"   CRC errors: {self._color(str(self.decoder.crc_errors), RED if self.decoder.crc_errors > 0 else GREEN)}")
+        print(f"   Decode errors: {self._color(str(self.decoder.decode_errors), RED if self.decoder.decode_errors > 0 else GREEN)}")
+        if self._renderer.dropped:
+            print(f"   Dropped (display backlog): {self._color(str(self._renderer.dropped), YELLOW)}")
         print()
 
 
 if __name__ == "__main__":
-    broker = sys.argv[1] if len(sys.argv) > 1 else "localhost"
-    port = int(sys.argv[2]) if len(sys.argv) > 2 else 1883
+    # --no-crc skips CRC verification (trusted links only)
+    args = [arg for arg in sys.argv[1:] if arg != "--no-crc"]
+    broker = args[0] if len(args) > 0 else "localhost"
+    port = int(args[1]) if len(args) > 1 else 1883
     
-    monitor = MQTTBinaryMonitor(broker, port)
+    monitor = MQTTBinaryMonitor(broker, port, verify_crc="--no-crc" not in sys.argv)
     monitor.run()
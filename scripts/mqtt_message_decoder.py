@@ -11,10 +11,19 @@ Usage:
 
 import paho.mqtt.client as mqtt
 import struct
-import uuid
+import sys
 import json
+import zlib
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+
+import binary_protocol as protocol
+from render_thread import RenderThread
+
+try:
+    import orjson  # optional: faster JSON parsing and formatting
+except ImportError:
+    orjson = None
 
 # MQTT Configuration
 BROKER = "localhost"
@@ -29,82 +38,127 @@ MSG_STATUS_UPDATE = 0x02
 MSG_TELEMETRY = 0x03
 MSG_ERROR = 0x04
 
+# Human-readable message type names
+_TYPE_NAMES = {
+    MSG_PISTON_STATE: "PISTON_STATE",
+    MSG_STATUS_UPDATE: "STATUS_UPDATE",
+    MSG_TELEMETRY: "TELEMETRY",
+    MSG_ERROR: "ERROR_REPORT"
+}
+
+# Precompiled little-endian layouts
+_PISTON_FMT = struct.Struct('<BBQ')       # piston number, state, timestamp
+_TELEM_TAIL = struct.Struct('<fQ')        # value, timestamp (after sensor string)
+_ERROR_HDR = struct.Struct('<H32s')       # error code, null-padded message
+_BATTERY_SIGNAL = struct.Struct('<BB')    # battery, signal (after status string)
+
+# bytes.translate table: printable ASCII kept, everything else shown as '.'
+_ASCII_TABLE = bytes(b if 32 <= b < 127 else 0x2E for b in range(256))
+
+
+def _uuid_str(b: bytes) -> str:
+    """Format 16 raw bytes as a canonical UUID string without building a UUID"""
+    h = b.hex()
+    return f"{h[0:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:32]}"
+
+
 class BinaryMessageDecoder:
     """Decodes binary protocol messages from IoT devices"""
     
+    # Fixed attribute set: slot access on the per-message path
+    __slots__ = ('message_count', 'start_time', '_decoders')
+    
     def __init__(self):
         self.message_count = 0
         self.start_time = datetime.now()
+        
+        # Payload decoder per message type
+        self._decoders = {
+            MSG_PISTON_STATE: self.decode_piston_state,
+            MSG_STATUS_UPDATE: self.decode_status_update,
+            MSG_TELEMETRY: self.decode_telemetry,
+            MSG_ERROR: self.decode_error,
+        }
     
     def calculate_crc16(self, data: bytes) -> int:
-        """Calculate CRC16-CCITT checksum"""
-        crc = 0xFFFF
-        for byte in data:
-            crc ^= byte << 8
-            for _ in range(8):
-                if crc & 0x8000:
-                    crc = (crc << 1) ^ 0x1021
-                else:
-                    crc = crc << 1
-                crc &= 0xFFFF
-        return crc
+        """
+        Calculate CRC16 checksum (poly 0x8005, reflected, init 0xFFFF)
+        
+        The CRC the devices and the backend use, shared with the device
+        client and monitor through binary_protocol.
+        """
+        return protocol.crc16(data)
     
     def decode_binary_message(self, payload: bytes) -> Optional[Dict[str, Any]]:
         """
         Decode a binary protocol message
         
         Format:
-        [1 byte]  Message Type
+        [1 byte]  Message Type (top bit set for protocol V2)
         [16 bytes] Device UUID
         [variable] Payload
-        [2 bytes]  CRC16 checksum
+        [2 bytes]  CRC16 checksum (V2: [4 bytes] CRC-32)
         """
         
-        if len(payload) < 19:  # Minimum: 1 + 16 + 2
+        if len(payload) < protocol.MIN_FRAME_SIZE:  # Minimum: 1 + 16 + 2
             return None
         
         try:
-            # Extract message type
-            message_type = payload[0]
+            # Slice through a memoryview: no bytes copy per field
+            mv = memoryview(payload)
             
-            # Extract device UUID (16 bytes)
-            device_uuid_bytes = payload[1:17]
-            device_uuid = str(uuid.UUID(bytes=device_uuid_bytes))
+            # Extract message type; V2 frames end in a CRC-32 instead
+            header = payload[0]
+            message_type = header & protocol.MSG_TYPE_MASK
+            if header & protocol.PROTOCOL_V2_FLAG:
+                version, crc_fmt, checksum = 2, protocol.CRC32_FMT, zlib.crc32
+            else:
+                version, crc_fmt, checksum = 1, protocol.CRC16_FMT, self.calculate_crc16
+            end = len(payload) - crc_fmt.size
+            if end < protocol.HEADER_SIZE:
+                return None
             
-            # Verify CRC (last 2 bytes)
-            data_without_crc = payload[:-2]
-            received_crc = struct.unpack('<H', payload[-2:])[0]
-            calculated_crc = self.calculate_crc16(data_without_crc)
+            # Verify the checksum before any decoding: a corrupted frame
+            # is reported without formatting fields that can't be trusted
+            received_crc, = crc_fmt.unpack_from(payload, end)
+            calculated_crc = checksum(mv[:end])
             
-            crc_valid = received_crc == calculated_crc
+            if received_crc != calculated_crc:
+                return {
+                    'message_type': message_type,
+                    'version': version,
+                    'crc_valid': False,
+                    'received_crc': received_crc,
+                    'calculated_crc': calculated_crc,
+                    'raw_length': len(payload)
+                }
+            
+            # Extract device UUID (16 bytes)
+            device_uuid_bytes = mv[1:17]
+            device_uuid = _uuid_str(device_uuid_bytes)
             
             # Extract payload data (between UUID and CRC)
-            payload_data = payload[17:-2]
+            payload_data = mv[protocol.HEADER_SIZE:end]
             
-            # Decode based on message type
+            # Decode based on message type. Raw ints only: names and hex
+            # strings are formatted in format_output when actually printed.
             decoded = {
                 'device_id': device_uuid,
                 'message_type': message_type,
-                'message_type_name': self.get_message_type_name(message_type),
-                'crc_valid': crc_valid,
-                'received_crc': f"0x{received_crc:04X}",
-                'calculated_crc': f"0x{calculated_crc:04X}",
-                'raw_length': len(payload),
-                'timestamp': datetime.now().isoformat()
+                'version': version,
+                'crc_valid': True,
+                'received_crc': received_crc,
+                'calculated_crc': calculated_crc,
+                'raw_length': len(payload)
             }
             
-            if message_type == MSG_PISTON_STATE:
-                decoded['data'] = self.decode_piston_state(payload_data)
-            elif message_type == MSG_STATUS_UPDATE:
-                decoded['data'] = self.decode_status_update(payload_data)
-            elif message_type == MSG_TELEMETRY:
-                decoded['data'] = self.decode_telemetry(payload_data)
-            elif message_type == MSG_ERROR:
-                decoded['data'] = self.decode_error(payload_data)
+            handler = self._decoders.get(message_type)
+            if handler is not None:
+                decoded['data'] = handler(payload_data)
             else:
                 decoded['data'] = {
                     'raw_hex': payload_data.hex(),
-                    'raw_ascii': self.safe_ascii(payload_data)
+                    'raw_ascii': self.safe_ascii(payload_data.tobytes())
                 }
             
             return decoded
@@ -119,8 +173,7 @@ class BinaryMessageDecoder:
     def decode_piston_state(self, payload: bytes) -> Dict[str, Any]:
         """Decode piston state change message"""
         if len(payload) >= 10:
-            piston_num, state = struct.unpack('<BB', payload[:2])
-            timestamp = struct.unpack('<Q', payload[2:10])[0]
+            piston_num, state, timestamp = _PISTON_FMT.unpack_from(payload)
             
             return {
                 'piston_number': piston_num,
@@ -142,12 +195,12 @@ class BinaryMessageDecoder:
             if len(payload) > 1:
                 status_len = payload[1]
                 if len(payload) >= 2 + status_len:
-                    status_str = payload[2:2+status_len].decode('utf-8', errors='ignore')
+                    status_str = str(payload[2:2+status_len], 'utf-8', 'ignore')
                     
                     # Battery and signal (optional, after status string)
                     offset = 2 + status_len
                     if len(payload) >= offset + 2:
-                        battery, signal = struct.unpack('<BB', payload[offset:offset+2])
+                        battery, signal = _BATTERY_SIGNAL.unpack_from(payload, offset)
                     
                     return {
                         'status': status_str,
@@ -166,11 +219,10 @@ class BinaryMessageDecoder:
             # Sensor type string length
             sensor_len = payload[0]
             if len(payload) >= 1 + sensor_len + 12:
-                sensor_type = payload[1:1+sensor_len].decode('utf-8', errors='ignore')
+                sensor_type = str(payload[1:1+sensor_len], 'utf-8', 'ignore')
                 offset = 1 + sensor_len
                 
-                value = struct.unpack('<f', payload[offset:offset+4])[0]
-                timestamp = struct.unpack('<Q', payload[offset+4:offset+12])[0]
+                value, timestamp = _TELEM_TAIL.unpack_from(payload, offset)
                 
                 return {
                     'sensor_type': sensor_type,
@@ -185,8 +237,7 @@ class BinaryMessageDecoder:
     def decode_error(self, payload: bytes) -> Dict[str, Any]:
         """Decode error report message"""
         if len(payload) >= 34:
-            error_code = struct.unpack('<H', payload[:2])[0]
-            error_msg_bytes = payload[2:34]
+            error_code, error_msg_bytes = _ERROR_HDR.unpack_from(payload)
             # Remove null padding
             error_msg = error_msg_bytes.rstrip(b'\x00').decode('utf-8', errors='ignore')
             
@@ -200,13 +251,10 @@ class BinaryMessageDecoder:
     
     def get_message_type_name(self, msg_type: int) -> str:
         """Get human-readable message type name"""
-        types = {
-            MSG_PISTON_STATE: "PISTON_STATE",
-            MSG_STATUS_UPDATE: "STATUS_UPDATE",
-            MSG_TELEMETRY: "TELEMETRY",
-            MSG_ERROR: "ERROR_REPORT"
-        }
-        return types.get(msg_type, f"UNKNOWN(0x{msg_type:02X})")
+        name = _TYPE_NAMES.get(msg_type)
+        if name is None:
+            return f"UNKNOWN(0x{msg_type:02X})"
+        return name
     
     def get_error_severity(self, code: int) -> str:
         """Determine error severity from code"""
@@ -245,54 +293,79 @@ class BinaryMessageDecoder:
     
     def safe_ascii(self, data: bytes) -> str:
         """Convert bytes to safe ASCII representation"""
-        return ''.join(chr(b) if 32 <= b < 127 else '.' for b in data)
+        return data.translate(_ASCII_TABLE).decode('ascii')
     
     def try_decode_json(self, payload: bytes) -> Optional[Dict[str, Any]]:
         """Try to decode payload as JSON"""
         try:
-            text = payload.decode('utf-8')
-            return json.loads(text)
+            # Both parsers accept bytes: no separate decode() copy
+            if orjson is not None:
+                return orjson.loads(payload)
+            return json.loads(payload)
         except:
             return None
     
-    def format_output(self, topic: str, decoded: Dict[str, Any], raw: bytes):
-        """Pretty print decoded message"""
+    def format_json(self, data: Any) -> str:
+        """Pretty-format decoded JSON with a 2-space indent"""
+        if orjson is not None:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2).decode('utf-8')
+        return json.dumps(data, indent=2)
+    
+    def format_output(self, topic: str, decoded: Dict[str, Any], raw: bytes,
+                      received_at: Optional[datetime] = None):
+        """Pretty print decoded message (stamped with received_at, default now)"""
         self.message_count += 1
+        if received_at is None:
+            received_at = datetime.now()
         
-        print("\n" + "═" * 70)
-        print(f"📨 Message #{self.message_count} | {datetime.now().strftime('%H:%M:%S.%f')[:-3]}")
-        print("─" * 70)
-        print(f"📍 Topic: {topic}")
-        print(f"📦 Size:  {len(raw)} bytes")
+        # Build the whole block and write it once: one stdout lock and
+        # flush per message instead of one per line
+        out = [
+            "\n" + "═" * 70,
+            f"📨 Message #{self.message_count} | {received_at.strftime('%H:%M:%S.%f')[:-3]}",
+            "─" * 70,
+            f"📍 Topic: {topic}",
+            f"📦 Size:  {len(raw)} bytes",
+        ]
         
         if 'error' in decoded:
-            print(f"\n❌ Decode Error: {decoded['error']}")
-            print(f"📄 Raw Hex: {decoded.get('raw_hex', '')[:100]}")
+            out.append(f"\n❌ Decode Error: {decoded['error']}")
+            out.append(f"📄 Raw Hex: {decoded.get('raw_hex', '')[:100]}")
+            self.write_lines(out)
             return
         
-        print(f"\n🔖 Message Type: {decoded['message_type_name']}")
-        print(f"🆔 Device ID:    {decoded['device_id'][:8]}...{decoded['device_id'][-4:]}")
+        out.append(f"\n🔖 Message Type: {self.get_message_type_name(decoded['message_type'])}")
+        if 'device_id' in decoded:
+            out.append(f"🆔 Device ID:    {decoded['device_id'][:8]}...{decoded['device_id'][-4:]}")
         
-        # CRC validation
+        # CRC validation (CRC-32 for V2 frames, shown at its full width)
+        digits = 8 if decoded['version'] == 2 else 4
         if decoded['crc_valid']:
-            print(f"✅ CRC Valid:    {decoded['received_crc']}")
+            out.append(f"✅ CRC Valid:    0x{decoded['received_crc']:0{digits}X}")
         else:
-            print(f"❌ CRC INVALID:  Received {decoded['received_crc']}, Expected {decoded['calculated_crc']}")
+            out.append(f"❌ CRC INVALID:  Received 0x{decoded['received_crc']:0{digits}X}, "
+                       f"Expected 0x{decoded['calculated_crc']:0{digits}X}")
         
         # Decode specific data
         if 'data' in decoded:
-            print("\n📊 Decoded Data:")
-            self.print_data(decoded['data'], indent=3)
+            out.append("\n📊 Decoded Data:")
+            self.print_data(decoded['data'], out, indent=3)
         
-        print("─" * 70)
+        out.append("─" * 70)
+        self.write_lines(out)
     
-    def print_data(self, data: Dict[str, Any], indent: int = 0):
-        """Recursively print dictionary with indentation"""
+    def write_lines(self, out: List[str]):
+        """Write buffered output lines to stdout in a single call"""
+        sys.stdout.write("\n".join(out) + "\n")
+        sys.stdout.flush()
+    
+    def print_data(self, data: Dict[str, Any], out: List[str], indent: int = 0):
+        """Recursively append dictionary lines with indentation to out"""
         prefix = " " * indent
         for key, value in data.items():
             if isinstance(value, dict):
-                print(f"{prefix}• {key}:")
-                self.print_data(value, indent + 2)
+                out.append(f"{prefix}• {key}:")
+                self.print_data(value, out, indent + 2)
             else:
                 # Add icons for specific fields
                 icon = ""
@@ -307,21 +380,31 @@ class BinaryMessageDecoder:
                 elif key in ["signal_strength", "signal_icon"]:
                     icon = ""
                 
-                print(f"{prefix}• {key}: {icon}{value}")
+                out.append(f"{prefix}• {key}: {icon}{value}")
 
 
 class MQTTDecoder:
     """MQTT client that decodes messages in real-time"""
     
+    # Messages waiting for the render thread; the oldest are dropped beyond this
+    QUEUE_SIZE = 10000
+    
+    __slots__ = ('decoder', 'client', '_renderer')
+    
     def __init__(self):
         self.decoder = BinaryMessageDecoder()
-        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION1, "mqtt-decoder")
+        self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, "mqtt-decoder")
         self.client.on_connect = self.on_connect
         self.client.on_message = self.on_message
+        
+        # paho's network thread only enqueues (topic, payload, receive time);
+        # decoding and printing happen on the render thread, so slow output
+        # can't stall MQTT reads
+        self._renderer = RenderThread(self.handle, self.QUEUE_SIZE)
     
-    def on_connect(self, client, userdata, flags, rc):
+    def on_connect(self, client, userdata, flags, reason_code, properties):
         """Callback when connected to MQTT broker"""
-        if rc == 0:
+        if reason_code == 0:
             print("╔═════════════════════════════════════════════════════════════╗")
             print("║         MQTT Binary Message Decoder - Connected            ║")
             print("╚═════════════════════════════════════════════════════════════╝")
@@ -334,55 +417,67 @@ class MQTTDecoder:
             
             print("\n👀 Listening for messages... (Press Ctrl+C to stop)\n")
         else:
-            print(f"❌ Connection failed with code {rc}")
+            print(f"❌ Connection failed with code {reason_code}")
     
     def on_message(self, client, userdata, msg):
-        """Callback when message received"""
+        """Callback when message received (network thread: enqueue only)"""
+        self._renderer.put(msg.topic, msg.payload, datetime.now())
+    
+    def handle(self, topic: str, payload: bytes, received_at: datetime):
+        """Decode one message and print it"""
         
         # First, try to decode as JSON (for backward compatibility)
-        json_data = self.decoder.try_decode_json(msg.payload)
+        json_data = self.decoder.try_decode_json(payload)
         
         if json_data:
             # It's a JSON message
             self.decoder.message_count += 1
-            print("\n" + "═" * 70)
-            print(f"📨 Message #{self.decoder.message_count} | {datetime.now().strftime('%H:%M:%S.%f')[:-3]}")
-            print("─" * 70)
-            print(f"📍 Topic: {msg.topic}")
-            print(f"📦 Format: JSON")
-            print(f"📄 Data:\n")
-            print(json.dumps(json_data, indent=2))
-            print("─" * 70)
+            self.decoder.write_lines([
+                "\n" + "═" * 70,
+                f"📨 Message #{self.decoder.message_count} | {received_at.strftime('%H:%M:%S.%f')[:-3]}",
+                "─" * 70,
+                f"📍 Topic: {topic}",
+                f"📦 Format: JSON",
+                f"📄 Data:\n",
+                self.decoder.format_json(json_data),
+                "─" * 70,
+            ])
         else:
             # Try to decode as binary
-            decoded = self.decoder.decode_binary_message(msg.payload)
+            decoded = self.decoder.decode_binary_message(payload)
             if decoded:
-                self.decoder.format_output(msg.topic, decoded, msg.payload)
+                self.decoder.format_output(topic, decoded, payload, received_at)
             else:
                 # Unknown format
                 self.decoder.message_count += 1
-                print("\n" + "═" * 70)
-                print(f"📨 Message #{self.decoder.message_count} | {datetime.now().strftime('%H:%M:%S.%f')[:-3]}")
-                print("─" * 70)
-                print(f"📍 Topic: {msg.topic}")
-                print(f"❓ Format: Unknown/Raw")
-                print(f"📦 Size: {len(msg.payload)} bytes")
-                print(f"📄 Raw Hex: {msg.payload.hex()[:100]}")
-                print(f"📝 ASCII: {self.decoder.safe_ascii(msg.payload)[:100]}")
-                print("─" * 70)
+                self.decoder.write_lines([
+                    "\n" + "═" * 70,
+                    f"📨 Message #{self.decoder.message_count} | {received_at.strftime('%H:%M:%S.%f')[:-3]}",
+                    "─" * 70,
+                    f"📍 Topic: {topic}",
+                    f"❓ Format: Unknown/Raw",
+                    f"📦 Size: {len(payload)} bytes",
+                    f"📄 Raw Hex: {payload.hex()[:100]}",
+                    f"📝 ASCII: {self.decoder.safe_ascii(payload)[:100]}",
+                    "─" * 70,
+                ])
     
     def run(self):
         """Connect and start listening"""
         try:
+            self._renderer.start()
             self.client.connect(BROKER, PORT, 60)
             self.client.loop_forever()
         except KeyboardInterrupt:
+            self._renderer.stop()
             print("\n\n🛑 Stopping decoder...")
             self.print_statistics()
         except Exception as e:
             print(f"\n❌ Error: {e}")
             print(f"   Make sure MQTT broker is running:")
             print(f"   docker compose ps mosquitto")
+        finally:
+            self._renderer.stop()
     
     def print_statistics(self):
         """Print session statistics"""
@@ -394,6 +489,8 @@ class MQTTDecoder:
         print(f"\n📊 Messages decoded: {self.decoder.message_count}")
         print(f"⏱️  Session duration: {uptime:.1f} seconds")
         print(f"📈 Messages/second: {self.decoder.message_count/uptime:.2f}" if uptime > 0 else "")
+        if self._renderer.dropped:
+            print(f"⚠️  Dropped (display backlog): {self._renderer.dropped}")
         print("\n✅ Decoder stopped cleanly\n")
 
 
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Render Thread
+Shared by the MQTT monitor and the message decoder: paho's network thread
+only enqueues received messages, and a background thread decodes and prints
+them, so slow terminal output can't stall MQTT reads.
+"""
+
+import threading
+from collections import deque
+
+
+class RenderThread:
+    """Bounded message queue drained by a background render thread"""
+    
+    def __init__(self, render, maxlen: int):
+        """
+        Args:
+            render: Called on the render thread with each queued item's fields
+            maxlen: Messages kept waiting; the oldest are dropped beyond this
+        """
+        self._render = render
+        self._maxlen = maxlen
+        self._queue = deque(maxlen=maxlen)
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self.dropped = 0
+    
+    def put(self, *item):
+        """Queue one message for rendering (safe to call from paho's thread)"""
+        if len(self._queue) == self._maxlen:
+            self.dropped += 1
+        self._queue.append(item)
+        self._wakeup.set()
+    
+    def _loop(self):
+        """Render queued messages until stopped"""
+        queue = self._queue
+        render = self._render
+        while not self._stopping:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            while queue:
+                render(*queue.popleft())
+    
+    def start(self):
+        """Start the render thread"""
+        self._stopping = False
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Render what is still queued, then stop the render thread"""
+        if self._thread is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._thread.join(timeout=2.0)
+        self._thread = None